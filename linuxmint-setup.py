@@ -8,12 +8,132 @@ Linux Mint setup script.
 """
 import os
 import sys
+import base64
 import argparse
+import functools
 import subprocess
-import urllib.request
+import concurrent.futures
+import threading
+import types
 import shutil
+import glob
+import tempfile
+import time
 import re
 
+JOURNALD_VALUE_WORDS = frozenset({"persistent", "auto", "volatile", "yes", "no"})
+JOURNALD_VALUE_SUFFIXES = frozenset("KMGTPsmhday")
+JOURNALD_ENTRY_REGEX = re.compile(r"(?m)^[ \t]*(\w+)[ \t]*=[ \t]*(.*?)[ \t]*$")
+SYSTEM_PATH = "/usr/sbin:/usr/bin:/sbin:/bin"
+PROXY_ENV = ("http_proxy", "https_proxy", "ftp_proxy", "no_proxy")
+PASSTHROUGH_ENV = (
+    ("TERM", "LANG", "LANGUAGE", "LC_ALL", "DEBIAN_FRONTEND")
+    + PROXY_ENV
+    + tuple(name.upper() for name in PROXY_ENV)
+)
+
+
+@functools.cache
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description=f"Usage: {os.path.basename(sys.argv[0])} [OPTIONS]",
+        formatter_class=argparse.RawTextHelpFormatter,
+        add_help=False,
+    )
+    parser.add_argument(
+        "-u", "--update", action="store_true", help="Update only system."
+    )
+    parser.add_argument(
+        "-r", "--remove", action="store_true", help="Remove only packages."
+    )
+    parser.add_argument(
+        "-i", "--install", action="store_true", help="Install only packages."
+    )
+    parser.add_argument(
+        "--vscode", action="store_true", help="Add repository and install VS Code."
+    )
+    parser.add_argument(
+        "-c", "--clean", action="store_true", help="Clean only packages."
+    )
+    parser.add_argument(
+        "-s", "--system", action="store_true", help="Setup system settings."
+    )
+    parser.add_argument(
+        "--no-tex",
+        action="store_true",
+        help="Skip the ~5GB TeX Live install in --install.",
+    )
+    parser.add_argument(
+        "--force-refresh",
+        action="store_true",
+        help="Refresh the APT lists even if they are recent.",
+    )
+    parser.add_argument(
+        "--force-restart",
+        action="store_true",
+        help="Restart all services in --system, not only reconfigured ones.",
+    )
+    parser.add_argument("-h", "--help", action="help", help="Show this help and quit.")
+    parser.add_argument("--elevated", action="store_true", help=argparse.SUPPRESS)
+    return parser
+
+
+def minimal_env():
+    """
+    Returns a fixed PATH plus the terminal, locale, debconf frontend and
+    proxy settings of os.environ.
+    """
+    env = {"PATH": SYSTEM_PATH}
+    env.update({k: os.environ[k] for k in PASSTHROUGH_ENV if k in os.environ})
+    return env
+
+
+def is_valid_journald_value(value):
+    """Checks for a journald keyword or a number with an optional unit suffix."""
+    if value in JOURNALD_VALUE_WORDS:
+        return True
+    number = value[:-1] if value[-1:] in JOURNALD_VALUE_SUFFIXES else value
+    return number.isascii() and number.isdigit()
+
+
+class ArmorChecksumError(Exception):
+    """The CRC-24 line of an ASCII-armored block does not match its data."""
+
+
+def crc24(data):
+    """Returns the OpenPGP CRC-24 checksum of data (RFC 4880, section 6.1)."""
+    crc = 0xB704CE
+    for byte in data:
+        crc ^= byte << 16
+        for _ in range(8):
+            crc <<= 1
+            if crc & 0x1000000:
+                crc ^= 0x1864CFB
+    return crc & 0xFFFFFF
+
+
+def dearmor(asc_data):
+    """
+    Converts an ASCII-armored OpenPGP block to binary, like 'gpg --dearmor'.
+    Raises ValueError if the data holds no armored block it can parse, and
+    ArmorChecksumError if the block is corrupted.
+    """
+    lines = asc_data.decode("ascii").splitlines()
+    try:
+        begin = next(i for i, s in enumerate(lines) if s.startswith("-----BEGIN "))
+        end = next(i for i, s in enumerate(lines) if s.startswith("-----END "))
+        blank = next(i for i in range(begin, end) if not lines[i].strip())
+    except StopIteration:
+        raise ValueError("no ASCII-armored OpenPGP block found") from None
+    body = [s.strip() for s in lines[blank + 1 : end]]
+    checksum = next((s[1:] for s in body if s.startswith("=")), None)
+    payload = "".join(s for s in body if not s.startswith("="))
+    data = base64.b64decode(payload, validate=True)
+    if checksum is not None:
+        if base64.b64decode(checksum, validate=True) != crc24(data).to_bytes(3, "big"):
+            raise ArmorChecksumError("ASCII armor checksum mismatch")
+    return data
+
 
 class Logger:
     RED = "\033[1;31m"
@@ -25,134 +145,295 @@ class Logger:
     BOLD = "\033[1m"
     RESET = "\033[0m"
 
+    def __init__(self):
+        out = self._colors(sys.stdout)
+        err = self._colors(sys.stderr)
+        self._section = f"\n\n{out.BLUE}[[ "
+        self._section_end = f" ]]{out.RESET}"
+        self._subsection = f"\n{out.CYAN}[ "
+        self._subsection_end = f" ]{out.RESET}"
+        self._step = f"  {out.WHITE}{out.BOLD}->{out.RESET} "
+        self._info = f"{out.GREEN}INFO:{out.RESET} "
+        self._success = f"{out.GREEN}{out.BOLD}* SUCCESS:{out.RESET} "
+        self._warning = f"{err.YELLOW}WARNING:{err.RESET} "
+        self._error = f"{err.RED}{err.BOLD}ERROR:{err.RESET} "
+        self._lock = threading.Lock()
+
+    def _colors(self, stream):
+        """Returns the color codes for stream, all empty unless it is a TTY."""
+        if stream.isatty():
+            return self
+        names = ("RED", "GREEN", "YELLOW", "BLUE", "CYAN", "WHITE", "BOLD", "RESET")
+        return types.SimpleNamespace(**dict.fromkeys(names, ""))
+
+    def _print(self, *parts, file=None, flush=False):
+        with self._lock:
+            if file is None:
+                sys.stdout.write("".join(parts) + "\n")
+                if flush:
+                    sys.stdout.flush()
+            else:
+                sys.stdout.flush()
+                file.write("".join(parts) + "\n")
+
+    def flush(self):
+        """Writes out buffered messages, e.g. before a child process prints."""
+        with self._lock:
+            sys.stdout.flush()
+            sys.stderr.flush()
+
     def section(self, message):
-        print(f"\n\n{self.BLUE}[[ {message.upper()} ]]{self.RESET}")
+        self._print(self._section, message.upper(), self._section_end)
 
+    # Subsections, steps and info lines announce work that may take a while,
+    # so they are shown at once; the other lines wait for the next flush.
     def subsection(self, message):
-        print(f"\n{self.CYAN}[ {message} ]{self.RESET}")
+        self._print(self._subsection, message, self._subsection_end, flush=True)
 
     def step(self, message):
-        print(f"  {self.WHITE}{self.BOLD}->{self.RESET} {message}...")
+        self._print(self._step, message, "...", flush=True)
 
     def info(self, message):
-        print(f"{self.GREEN}INFO:{self.RESET} {message}.")
+        self._print(self._info, message, ".", flush=True)
 
     def success(self, message):
-        print(f"{self.GREEN}{self.BOLD}* SUCCESS:{self.RESET} {message}.")
+        self._print(self._success, message, ".")
 
     def warning(self, message):
-        print(f"{self.YELLOW}WARNING:{self.RESET} {message}?", file=sys.stderr)
+        self._print(self._warning, message, "?", file=sys.stderr)
 
     def error(self, message):
-        print(f"{self.RED}{self.BOLD}ERROR:{self.RESET} {message}!", file=sys.stderr)
+        self._print(self._error, message, "!", file=sys.stderr)
 
 
 class Setup(object):
     def __init__(self, logger):
-        self.parser = argparse.ArgumentParser(
-            description=f"Usage: {os.path.basename(sys.argv[0])} [OPTIONS]",
-            formatter_class=argparse.RawTextHelpFormatter,
-            add_help=False,
-        )
-        self.options = [
-            ["u", "update", "store_true", "Update only system."],
-            ["r", "remove", "store_true", "Remove only packages."],
-            ["i", "install", "store_true", "Install only packages."],
-            [None, "vscode", "store_true", "Add repository and install VS Code."],
-            ["c", "clean", "store_true", "Clean only packages."],
-            ["s", "system", "store_true", "Setup system settings."],
-            ["h", "help", "help", "Show this help and quit."],
-        ]
         self.logger = logger
+        self._vscode_key = None
+        self._uid = os.getuid()
+        self._sudo_user = os.environ.get("SUDO_USER")
+        self._env = minimal_env()
+        if self._sudo_user and self._uid == 0:
+            self._sudo_prefix = ["sudo", "-u", self._sudo_user]
+        else:
+            self._sudo_prefix = []
 
-    def _add_argument(self, short, long, action, help_text):
-        flags = [f"-{short}" if short else None, f"--{long}"]
-        flags = [f for f in flags if f]
-        self.parser.add_argument(*flags, action=action, help=help_text)
-
-    def elevate_privileges(self):
-        """Elevate privileges using sudo if not running as root."""
-        self.logger.info(f"Current UID: {os.getuid()}")
-        if os.getuid() != 0:
+    def elevate_privileges(self, elevated=False):
+        """
+        Elevate privileges using sudo if not running as root.
+        The re-executed process gets --elevated so it neither repeats the
+        checks already done nor tries to elevate again.
+        """
+        if elevated:
+            if self._uid != 0:
+                self.logger.error(f"Still not ROOT after sudo, UID: {self._uid}")
+                sys.exit(1)
+            return
+        self.logger.info(f"Current UID: {self._uid}")
+        if self._uid != 0:
             self.logger.subsection("Elevating privileges to ROOT")
-            cmd = ("sudo", sys.executable, *sys.argv)
+            cmd = ("sudo", sys.executable, *sys.argv, "--elevated")
             try:
-                os.execvp("sudo", cmd)
+                os.execve("/usr/bin/sudo", cmd, self._env)
             except Exception as e:
                 self.logger.error(f"Failed to elevate privileges: {e}")
                 sys.exit(1)
 
+    def _as_user(self, cmd):
+        if self._sudo_prefix:
+            self.logger.info(f"Running '{cmd[0]}' as user: {self._sudo_user}")
+        return self._sudo_prefix + cmd
+
+    def _spawn(self, cmd, check=False):
+        """
+        Runs a trusted system command with os.posix_spawnp and a minimal
+        environment and waits for it.
+        Returns the exit code, or raises CalledProcessError if check is set.
+        """
+        self.logger.flush()
+        pid = os.posix_spawnp(cmd[0], cmd, self._env)
+        _, status = os.waitpid(pid, 0)
+        returncode = os.waitstatus_to_exitcode(status)
+        if check and returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd)
+        return returncode
+
     def run_as_user(self, cmd, check=True):
         """
         Runs any command as the original logged-in user.
         If not running under sudo, it runs as the current user.
         """
-        original_user = os.environ.get("SUDO_USER")
-        if original_user and os.getuid() == 0:
-            self.logger.info(f"Running '{cmd[0]}' as user: {original_user}")
-            full_cmd = ["sudo", "-u", original_user] + cmd
-        else:
-            full_cmd = cmd
+        self.logger.flush()
         try:
-            return subprocess.run(full_cmd, check=check)
+            return subprocess.run(self._as_user(cmd), check=check)
         except subprocess.CalledProcessError as e:
             self.logger.error(
                 f"Execution failed for '{cmd[0]}'. Exit code: {e.returncode}"
             )
             return None
 
+    def _parallel(self, tasks):
+        """
+        Runs (function, *args) tasks on one thread each and returns their
+        results in order.
+        """
+        tasks = list(tasks)
+        if not tasks:
+            return []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+            return list(pool.map(lambda task: task[0](*task[1:]), tasks))
+
+    def start_as_user(self, cmds):
+        """
+        Starts independent commands as the original logged-in user in the
+        background, capturing their output. Collect them with wait_all().
+        """
+        return [
+            (
+                cmd,
+                subprocess.Popen(
+                    self._as_user(cmd),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                ),
+            )
+            for cmd in cmds
+        ]
+
+    def wait_all(self, started):
+        """Waits for commands from start_as_user() and prints their output in order."""
+        returncodes = []
+        for cmd, proc in started:
+            stdout, stderr = proc.communicate()
+            sys.stdout.write(stdout)
+            self.logger.flush()
+            sys.stderr.write(stderr)
+            if proc.returncode != 0:
+                self.logger.error(
+                    f"Execution failed for '{cmd[0]}'. Exit code: {proc.returncode}"
+                )
+            returncodes.append(proc.returncode)
+        return returncodes
+
     def cli_options(self):
-        for option in self.options:
-            self._add_argument(*option)
-        return self.parser.parse_args()
+        return build_parser().parse_args()
 
     def check_argv(self, argv):
         self.logger.step("Checking if CLI options were given")
         if len(argv) == 1:
-            self.parser.print_help()
+            build_parser().print_help()
             sys.exit(1)
         self.logger.success(f"{len(argv)-1} given")
 
-    def update(self):
+    def _apt_cache_is_fresh(self, max_age=3600):
+        """
+        Checks if the APT lists were refreshed within the last max_age seconds.
+        Index files keep the server's Last-Modified time, so the directories
+        and APT's update stamp are used instead.
+        """
+        stamps = [
+            "/var/lib/apt/lists",
+            "/var/lib/apt/lists/partial",
+            "/var/lib/apt/periodic/update-success-stamp",
+        ]
+        newest = 0
+        for stamp in stamps:
+            try:
+                newest = max(newest, os.stat(stamp).st_mtime)
+            except OSError:
+                pass
+        return time.time() - newest < max_age
+
+    def update(self, force=False):
         self.logger.subsection("System Refresh")
-        self.logger.step("Updating APT cache")
-        subprocess.run(["apt", "update", "-y"])
-        self.logger.step("Ensuring Nala is installed")
-        subprocess.run(["apt", "install", "-y", "nala"])
-        self.logger.step("Syncing Nala with repositories")
-        subprocess.run(["nala", "update"])
+        nala_installed = shutil.which("nala") is not None
+        if not force and nala_installed and self._apt_cache_is_fresh():
+            self.logger.info("APT lists were refreshed recently, skipping update")
+            return
+        if nala_installed:
+            self.logger.step("Syncing Nala with repositories")
+            self._spawn(["nala", "update"])
+        else:
+            self.logger.step("Updating APT cache")
+            self._spawn(["apt", "update", "-y"])
+            self.logger.step("Installing Nala")
+            self._spawn(["apt", "install", "-y", "nala"])
         self.logger.success("System repositories are up to date")
 
     def upgrade(self):
-        self.update()
         self.logger.subsection("Full System Upgrade")
         self.logger.step("Running Nala upgrade")
-        subprocess.run(["nala", "upgrade", "-y"])
+        # The lists were refreshed in the REFRESH section; do not fetch them again.
+        self._spawn(["nala", "upgrade", "-y", "--no-update"])
         self.logger.success("All system packages are current")
 
     def remove(self, categories=None):
         if categories:
+            self.logger.subsection("Removing Categories")
+            for key, packages in categories.items():
+                self.logger.info(f"{key}: {len(packages)} packages queued for purge")
+            packages = list(dict.fromkeys(p for v in categories.values() for p in v))
+            self.logger.step(f"Purging {len(packages)} packages in one transaction")
+            returncode = self._spawn(["nala", "purge", "-y"] + packages)
+            if returncode == 0:
+                self.logger.success("Removed all packages in all categories")
+                return
+            if len(categories) == 1:
+                self.logger.error(f"Purge failed. Exit code: {returncode}")
+                return
+            self.logger.warning("Batch purge failed, retry category by category")
             for key, packages in categories.items():
                 self.logger.subsection(f"Removing Category: {key}")
                 self.logger.step(f"Purging {len(packages)} packages")
-                subprocess.run(["nala", "purge", "-y"] + packages)
+                self._spawn(["nala", "purge", "-y"] + packages)
                 self.logger.success(f"Removed all packages in {key}")
 
     def install(self, categories=None):
         if categories:
+            self.logger.subsection("Installing Categories")
+            for key, packages in categories.items():
+                self.logger.info(f"{key}: {len(packages)} packages queued")
+            packages = list(dict.fromkeys(p for v in categories.values() for p in v))
+            self.logger.step(f"Installing {len(packages)} packages in one transaction")
+            returncode = self._spawn(["nala", "install", "-y"] + packages)
+            if returncode == 0:
+                self.logger.success("All categories installed successfully")
+                return
+            if len(categories) == 1:
+                self.logger.error(f"Installation failed. Exit code: {returncode}")
+                return
+            self.logger.warning("Batch install failed, retry category by category")
             for key, packages in categories.items():
                 self.logger.subsection(f"Installing Category: {key}")
                 self.logger.step(f"Installing {len(packages)} packages from {key}")
-                subprocess.run(["nala", "install", "-y"] + packages)
+                self._spawn(["nala", "install", "-y"] + packages)
                 self.logger.success(f"Category {key} installed successfully")
 
     def clean(self):
-        self.logger.step("Autoremoving")
-        subprocess.run(["nala", "autoremove"])
-        self.logger.step("Autopurging")
-        subprocess.run(["nala", "autopurge"])
+        self.logger.step("Autoremoving and purging")
+        self._spawn(["nala", "autopurge"])
         self.logger.step("Cleaning")
-        subprocess.run(["nala", "clean"])
+        self._spawn(["nala", "clean"])
+
+    def _download(self, url):
+        """Downloads url and returns its content."""
+        # Imported here: only --vscode downloads anything, and urllib.request
+        # pulls in ssl and http.client. Its opener honours the *_proxy variables.
+        import urllib.request
+
+        with urllib.request.urlopen(url, timeout=30) as response:
+            return response.read()
+
+    def prefetch_vscode_key(self):
+        """Starts downloading the Microsoft GPG key in the background, once."""
+        if self._vscode_key is None:
+            url = "https://packages.microsoft.com/keys/microsoft.asc"
+            self.logger.step("Downloading Microsoft GPG key in the background")
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+            self._vscode_key = executor.submit(self._download, url)
+            executor.shutdown(wait=False)
+        return self._vscode_key
 
     def install_vscode(self):
         self.logger.subsection("VS Code Repository & Key Setup")
@@ -169,24 +450,38 @@ class Setup(object):
             "/etc/apt/trusted.gpg.d/microsoft.gpg",
             keyring_path,
         ]
+        key_download = self.prefetch_vscode_key()
+        wanted = {}
         for f in conflicting_files:
-            if os.path.exists(f):
+            wanted.setdefault(os.path.dirname(f), set()).add(os.path.basename(f))
+        for directory, names in wanted.items():
+            try:
+                entries = [e for e in os.scandir(directory) if e.name in names]
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                self.logger.error(f"Could not scan {directory}: {e}")
+                continue
+            for entry in entries:
                 try:
-                    os.remove(f)
-                    self.logger.info(f"Removed conflicting file: {f}")
-                except Exception as e:
-                    self.logger.error(f"Could not remove {f}: {e}")
+                    os.unlink(entry.path)
+                    self.logger.info(f"Removed conflicting file: {entry.path}")
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    self.logger.error(f"Could not remove {entry.path}: {e}")
         try:
+            self.logger.step("Waiting for GPG key download")
+            asc_data = key_download.result()
             os.makedirs(keyring_dir, exist_ok=True)
-            self.logger.step("Downloading fresh GPG key from Microsoft")
-            url = "https://packages.microsoft.com/keys/microsoft.asc"
-            with urllib.request.urlopen(url) as response:
-                asc_data = response.read()
-            gpg_result = subprocess.run(
-                ["gpg", "--dearmor"], input=asc_data, capture_output=True, check=True
-            )
-            with open(keyring_path, "wb") as f:
-                f.write(gpg_result.stdout)
+            try:
+                key_data = dearmor(asc_data)
+                with open(keyring_path, "wb") as f:
+                    f.write(key_data)
+            except ValueError as e:
+                self.logger.warning(f"{e}, falling back to 'gpg --dearmor'")
+                gpg_cmd = ["gpg", "--batch", "--yes", "--dearmor", "-o", keyring_path]
+                subprocess.run(gpg_cmd, input=asc_data, check=True)
             os.chmod(keyring_path, 0o644)
             self.logger.info(f"GPG key successfully installed to {keyring_path}")
             self.logger.step("Creating clean repository list")
@@ -196,17 +491,46 @@ class Setup(object):
             )
             with open(repo_path, "w") as f:
                 f.write(repo_entry)
-            self.logger.step("Clearing local APT lists for fresh sync")
-            subprocess.run(["rm", "-rf", "/var/lib/apt/lists/*"], check=True)
+            self.logger.step("Clearing cached Microsoft APT lists for fresh sync")
+            for f in glob.glob("/var/lib/apt/lists/packages.microsoft.com_*"):
+                os.remove(f)
             self.logger.step("Running Nala update and installing 'code'")
-            subprocess.run(["nala", "update"], check=True)
-            subprocess.run(["nala", "install", "-y", "code"], check=True)
+            self._spawn(["nala", "update"], check=True)
+            self._spawn(["nala", "install", "-y", "code"], check=True)
             self.logger.success("VS Code installed successfully")
         except Exception as e:
             self.logger.error(f"Installation failed: {e}")
 
+    def write_config(self, path, content, mode=0o644):
+        """
+        Atomically replaces a config file, unless it already has the given content.
+        Returns True if the file was written, False if it was left untouched.
+        """
+        try:
+            with open(path, "r") as f:
+                if f.read() == content:
+                    return False
+        except FileNotFoundError:
+            pass
+        with tempfile.NamedTemporaryFile(
+            "w", dir=os.path.dirname(path), prefix=".tmp-", delete=False
+        ) as f:
+            try:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+                os.chmod(f.name, mode)
+                os.replace(f.name, path)
+            except BaseException:
+                os.unlink(f.name)
+                raise
+        return True
+
     def apply_sysctl_optimizations(self):
-        """Applies kernel and virtual memory optimizations for laptop stability."""
+        """
+        Applies kernel and virtual memory optimizations for laptop stability.
+        Returns True if the drop-in file was rewritten.
+        """
         self.logger.subsection("Kernel & VM Optimizations")
         target_file = "/etc/sysctl.d/99-zzz-sysctl.conf"
         sysctl_content = (
@@ -218,82 +542,405 @@ class Setup(object):
             "vm.dirty_ratio = 60\n"
             "vm.swappiness = 10\n"
         )
+        changed = False
         try:
             self.logger.step(f"Writing optimizations to {target_file}")
-            with open(target_file, "w") as f:
-                f.write(sysctl_content)
-            os.chmod(target_file, 0o644)
+            changed = self.write_config(target_file, sysctl_content)
+            if not changed:
+                self.logger.info(f"{target_file} is already up to date")
             self.logger.step("Reloading sysctl configuration")
-            subprocess.run(["sysctl", "--system"], check=True, capture_output=True)
+            subprocess.run(
+                ["sysctl", "--system"], check=True, capture_output=True, env=self._env
+            )
             self.logger.success("Kernel and VM parameters applied successfully")
         except Exception as e:
             self.logger.error(f"Failed to apply sysctl settings: {e}")
+        return changed
 
-    def set_journald_property(self, key, value):
+    def set_journald_properties(self, props):
+        """
+        Sets all given journald.conf keys in a single read and write.
+        Returns True if journald.conf was rewritten, False if it already had
+        these values or could not be changed.
+        """
         config_file = "/etc/systemd/journald.conf"
         backup_file = f"{config_file}.bak"
-        val_regex = r"(^[0-9]+[KMGTPsmhday]?$)|(^(persistent|auto|volatile|yes|no)$)"
-        if not re.match(val_regex, str(value)):
-            self.logger.error(f"Invalid value '{value}' for key '{key}'")
-            return False
+        for key, value in props.items():
+            if not is_valid_journald_value(str(value)):
+                self.logger.error(f"Invalid value '{value}' for key '{key}'")
+                return False
         try:
+            with open(config_file, "r") as f:
+                text = f.read()
+            current = dict(JOURNALD_ENTRY_REGEX.findall(text))
+            if all(current.get(key) == str(value) for key, value in props.items()):
+                self.logger.info("Journald is already configured, nothing to change")
+                return False
             if not os.path.exists(backup_file):
                 shutil.copy2(config_file, backup_file)
                 self.logger.info(f"Backup created: {backup_file}")
-            with open(config_file, "r") as f:
-                lines = f.readlines()
-            new_lines = []
-            for line in lines:
-                stripped = line.strip()
-                if not (
-                    stripped.startswith(f"{key}=") or stripped.startswith(f"#{key}=")
-                ):
-                    new_lines.append(line)
-            final_lines = []
-            found_section = False
-            for line in new_lines:
-                final_lines.append(line)
-                if "[Journal]" in line:
-                    final_lines.append(f"{key}={value}\n")
-                    found_section = True
-            if not found_section:
-                final_lines.insert(0, f"[Journal]\n{key}={value}\n")
-            with open(config_file, "w") as f:
-                f.writelines(final_lines)
-            self.logger.step(f"Journald: {key} set to {value}")
-            return True
+            keys = "|".join(map(re.escape, props))
+            text = re.sub(rf"(?m)^[ \t]*#?[ \t]*(?:{keys})[ \t]*=.*\n?", "", text)
+            entries = "".join(f"{key}={value}\n" for key, value in props.items())
+            section = re.search(r"(?m)^\[Journal\][ \t]*$\n?", text)
+            if section:
+                head = text[: section.end()]
+                if not head.endswith("\n"):
+                    head += "\n"
+                text = head + entries + text[section.end() :]
+            else:
+                text = f"[Journal]\n{entries}" + text
+            changed = self.write_config(config_file, text)
+            for key, value in props.items():
+                self.logger.step(f"Journald: {key} set to {value}")
+            return changed
         except Exception as e:
             self.logger.error(f"Failed to modify journald.conf: {e}")
             return False
 
-    def activate_service(self, service_name):
-        """Enable, start, and restart a systemd service, then show status."""
+    def activate_service(self, service_name, restart=True):
+        """
+        Enable and start a systemd service, restart it if restart is set, then
+        verify it is active.
+        """
         self.logger.step(f"Activating service: {service_name}")
         try:
-            subprocess.run(["systemctl", "enable", "--now", service_name], check=True)
-            subprocess.run(["systemctl", "restart", service_name], check=True)
+            self._spawn(["systemctl", "enable", "--now", service_name], check=True)
+            if restart:
+                self._spawn(["systemctl", "restart", service_name], check=True)
             self.logger.info(f"Verifying status for {service_name}")
             status = subprocess.run(
-                ["systemctl", "--no-pager", "status", service_name, "-n", "0"],
+                ["systemctl", "is-active", service_name],
                 capture_output=True,
                 text=True,
+                env=self._env,
             )
-            if status.returncode == 0:
+            state = status.stdout.strip()
+            if state == "active":
                 self.logger.success(f"Service {service_name} is active and enabled")
             else:
-                self.logger.warning(
-                    f"Service {service_name} started but status reported issues"
-                )
+                self.logger.warning(f"Service {service_name} started but is {state}")
         except subprocess.CalledProcessError as e:
             self.logger.error(f"Failed to activate service {service_name}: {e}")
 
+    def activate_services(self, service_names, restart=None):
+        """
+        Enable and start all systemd services with one systemctl call, restart
+        those in restart (all if None), then verify them. Falls back to one
+        service at a time if the batched calls fail, e.g. for a missing unit.
+        """
+        restart = service_names if restart is None else restart
+        self.logger.step(f"Activating services: {', '.join(service_names)}")
+        try:
+            self._spawn(["systemctl", "enable", "--now", *service_names], check=True)
+            if restart:
+                self._spawn(["systemctl", "restart", *restart], check=True)
+        except subprocess.CalledProcessError as e:
+            self.logger.warning(f"Batched activation failed ({e}), retry one by one")
+            self._parallel(
+                (self.activate_service, name, name in restart) for name in service_names
+            )
+            return
+        self.logger.info("Verifying service states")
+        status = subprocess.run(
+            ["systemctl", "is-active", *service_names],
+            capture_output=True,
+            text=True,
+            env=self._env,
+        )
+        for service_name, state in zip(service_names, status.stdout.splitlines()):
+            if state == "active":
+                self.logger.success(f"Service {service_name} is active and enabled")
+            else:
+                self.logger.warning(f"Service {service_name} started but is {state}")
+
+
+# Package categories for --remove and --install. Packages are installed or
+# purged in the order listed here; list every package in one category only.
+REMOVE_CATEGORIES = {
+    "VIM": [
+        "vim*",
+    ],
+    "UNWANTED": [
+        "gcolor3",
+        "thunderbird*",
+    ],
+}
+
+INSTALL_CATEGORIES = {
+    "APT": [
+        # 1. Base
+        "ubuntu-standard",  # Core system utilities
+        "apt-transport-https",  # HTTPS repo support
+        # 2. Management
+        "aptitude",  # Advanced terminal interface
+        "synaptic",  # Graphical package manager
+        # 3. Automation
+        "unattended-upgrades",  # Security auto-patching
+        # 4. Experience
+        "ubuntu-restricted-extras",  # Media codecs and MS fonts
+    ],
+    "PACKAGE_TOOLS": [
+        # 1. Infrastructure
+        "bash-completion",  # Terminal tab-completion
+        "ca-certificates",  # SSL/TLS validation
+        "software-properties-common",  # Repository management
+        # 2. Frontends
+        "nala",  # Modern terminal frontend
+        "apt-file",  # Package file search
+        # 3. Python
+        "python3-apt",  # Python APT bindings
+        # 4. Maintenance
+        "needrestart",  # Service restart prompter
+        "ppa-purge",  # PPA rollback utility
+        "deborphan",  # Orphaned library finder
+    ],
+    "REQUIRED": [
+        # 1. Hardware
+        "thermald",  # Intel thermal management
+        "smartmontools",  # SSD health monitoring
+        # 2. Optimization
+        "haveged",  # Entropy daemon (Speed)
+        "preload",  # Application readahead
+        # 3. CLI Tools
+        "tmux",  # Terminal multiplexer
+        "neovim",  # Terminal text editor
+    ],
+    "UTILITY": [
+        # 1. Navigation
+        "mc",  # Dual-pane file manager
+        "tree",  # Directory tree visualizer
+        "fzf",  # Fuzzy finder (Command-line)
+        "eza",  # Enhanced 'ls' with colors
+        "zoxide",  # Fast directory jumper ('z')
+        # 2. Disk Analysis
+        "duf",  # User-friendly 'df' (Disk info)
+        "ncdu",  # Interactive disk usage analyzer
+        "gdisk",  # GPT partition table manipulator
+        # 3. Text & Data
+        "bat",  # Syntax-highlighting 'cat'
+        "ripgrep",  # Blazing fast 'grep' ('rg')
+        "jq",  # Command-line JSON processor
+        # 4. Configuration
+        "dconf-cli",  # Backend settings access
+        "dconf-editor",  # Graphical settings editor
+    ],
+    "ANALYZE": [
+        # 1. Monitoring
+        "btop",  # Modern dashboard monitor
+        "htop",  # Interactive process viewer
+        "nmon",  # Comprehensive system stats
+        # 2. Specialized
+        "iotop",  # Disk I/O monitor by process
+        # 3. Hardware
+        "hwinfo",  # Hardware probing tool
+        "inxi",  # Full hardware/driver summary
+    ],
+    "NETWORK": [
+        # 1. Base
+        "net-tools",  # Classic 'ifconfig' utilities
+        # 2. Transfer & Speed
+        "curl",  # Versatile data transfer tool
+        "wget",  # Standard file downloader
+        "speedtest-cli",  # Terminal speed test
+        # 3. Remote Access
+        "openssh-client",  # SSH client binary
+        "openssh-server",  # SSH daemon for remote login
+        "openssh-sftp-server",  # Secure file transfer engine
+        "sshfs",  # Filesystem client based on SSH File Transfer Protocol
+    ],
+    "SPELLING": [
+        # 1. Frameworks
+        "libenchant-2-2",  # App-to-dictionary bridge
+        "hunspell",  # Modern standard engine
+        "aspell",  # Classic CLI engine
+        # 2. German (DE)
+        "hunspell-de-de-frami",  # Primary German dict
+        "aspell-de",  # CLI German dict
+        "myspell-dictionary-de",  # Legacy German support
+        "mythes-de",  # German Thesaurus
+        "hyphen-de",  # German Hyphenation
+        # 3. English (EN)
+        "hunspell-en-us",  # Primary English dict
+        "aspell-en",  # CLI English dict
+        "mythes-en-us",  # English Thesaurus
+        "hyphen-en-us",  # English Hyphenation
+    ],
+    "ACCESSORY": [
+        # 1. Themes (Qt/GTK Sync)
+        "adwaita-qt",  # Qt5 theme matching
+        "adwaita-qt6",  # Qt6 theme matching
+        "qt5ct",  # Qt5 config utility
+        "qt6ct",  # Qt6 config utility
+        # 2. Productivity
+        "meld",  # Visual diff/merge tool
+        # 3. Media
+        "cheese",  # Webcam tester
+        "transmission-gtk",  # Lightweight Torrent client
+    ],
+    "OFFICE": [
+        # 1. LibreOffice
+        "libreoffice",  # Full office suite
+        "libreoffice-gtk3",  # XFCE UI integration
+        "libreoffice-style-sifr",  # Flat icon theme
+        "libreoffice-l10n-de",  # German UI translation
+        # 2. Publishing
+        "pandoc",  # Document converter
+    ],
+    "GRAPHIC": [
+        # 1. Raster (GIMP)
+        "gimp",  # GNU Image Manipulation Program
+        "gimp-data-extras",  # Brushes and patterns
+        "gimp-plugin-registry",  # Essential plugin bundle
+        "gimp-help-de",  # German GIMP manuals
+        # 2. Vector (Inkscape)
+        "inkscape",  # Vector graphics editor
+        # 3. Hardware
+        "libwacom-common",  # Wacom/Tablet support
+    ],
+    "MULTIMEDIA": [
+        # 1. Playback
+        "mpv",  # Fast, GPU-accelerated player
+        "yt-dlp",  # YouTube/Video downloader
+        # 2. VLC Suite
+        "vlc",  # Universal media player
+        "vlc-l10n",  # German UI for VLC
+        "vlc-plugin-pipewire",  # Native PipeWire audio
+        "vlc-plugin-jack",  # JACK audio support
+        "vlc-plugin-fluidsynth",  # MIDI synth support
+        "vlc-plugin-svg",  # SVG icon support
+        "vlc-plugin-visualization",  # Audio visualizers
+        # 3. Audio Tools
+        "audacity",  # Waveform audio editor
+        "pavucontrol",  # PipeWire/Pulse Mixer
+    ],
+    "CODEC": [
+        # 1. Frameworks
+        "ffmpeg",  # The Swiss-army knife for media
+        "libavif-bin",  # AVIF image support
+        "libwebm-tools",  # WebM processing
+        "libwebm1",  # WebM runtime library
+        # 2. Video
+        "dav1d",  # Ultra-fast AV1 decoder
+        "davs2",  # AVS2 support
+        "rav1e",  # Rust-based AV1 encoder
+        "svt-av1",  # Intel-optimized AV1 (Best for you)
+        "x264",  # H.264/AVC standard
+        "x265",  # H.265/HEVC standard
+        # 3. Audio
+        "aften",  # AC3 toolset
+        "faac",  # AAC encoder
+        "fdkaac",  # FDK-AAC CLI
+        "libfdk-aac2",  # FDK-AAC library
+        "lame",  # MP3 encoder
+        "speex",  # Speech-specific codec
+        # 4. Utilities
+        "mkvtoolnix",  # MKV editor (mkvmerge)
+        "ogmtools",  # OGG/OGM stream tools
+    ],
+    "COMPRESSION": [
+        # 1. Standards
+        "tar",  # Standard Unix archiver
+        "gzip",  # Standard compression
+        "bzip2",  # High compression legacy
+        "zip",  # Universal Windows compatibility
+        "unzip",  # Standard extractor
+        # 2. Parallel (Multi-threaded)
+        "pigz",  # Multi-core GZIP (Fast!)
+        "pbzip2",  # Multi-core BZIP2
+        "lbzip2",  # Fast multi-core BZIP2
+        "pixz",  # Parallel XZ with indexing
+        "zstd",  # Modern Facebook-speed standard
+        "lz4",  # Fastest real-time compression
+        "lrzip",  # For very large archives
+        # 3. Specialized
+        "7zip",  # 7-Zip (Modern p7zip)
+        "zpaq",  # Maximum data density
+        "lzip",  # Error-resilient LZMA
+        "plzip",  # Multi-core LZIP
+        "tarlz",  # Tar with LZIP support
+        "lzop",  # Low-CPU overhead LZO
+        # 4. Legacy & Windows
+        "unar",  # Universal extractor (Best for XFCE)
+        "unrar",  # RAR extraction support
+        "rar",  # RAR creation support
+        "cabextract",  # Microsoft .cab support
+        "lhasa",  # LZH/LHA support
+        "unace",  # ACE support
+        "dar",  # Disk Archive (Backups)
+        "par2",  # Data repair/redundancy
+    ],
+    "DEVELOPMENT_COMPILER": [
+        "build-essential",  # Standard C/C++ toolchain (make, gcc)
+        "cmake",  # Cross-platform build automation
+        "cmake-format",  # Formatter for CMake scripts
+        "ninja-build",  # Fast alternative to 'make'
+        "clang",  # LLVM-based C/C++ compiler
+        "clang-format",  # Standard C++ code formatter
+        "clang-tidy",  # Static analyzer for C++
+        "clang-tools",  # Extra LLVM development utilities
+        "lldb",  # High-performance debugger
+        "libmagic-dev",  # Development files for file-type detection
+        "libmagickwand-dev",  # ImageMagick C-API library
+        "libssl-dev",  # Header files for SSL/TLS
+        "valgrind",  # Memory leak and profiling tool
+    ],
+    "DEVELOPMENT_PYTHON": [
+        "pipx",  # Isolated CLI tool installer (Safe for Mint)
+        "python-is-python3",  # Maps 'python' command to python3
+        "python3-gpg",  # GPG library for your script's logic
+        "python3-pip",  # Standard package installer
+        "python3-venv",  # Native virtual environment support
+        "pipenv",  # Deterministic dependency management
+        "python3-poetry",  # Modern project/package manager
+        "black",  # Uncompromising code formatter
+        "python3-autopep8",  # PEP 8 style guide formatter
+        "python3-flake8",  # Code linter for syntax/style
+        "python3-pytest",  # Advanced testing framework
+    ],
+    "DEVELOPMENT_SHELL": [
+        "expect",  # Automation for interactive CLI prompts
+        "shellcheck",  # Static analysis/linter for scripts
+        "shfmt",  # Shell script formatter
+    ],
+    "DEVELOPMENT_DOCS": [
+        "bash-doc",  # Local documentation for Bash
+        "linux-doc",  # Deep Linux kernel manuals
+        "python3-doc",  # Local Python 3 reference
+        "zeal",  # Offline API documentation browser
+    ],
+    "DEVELOPMENT_JAVA": [
+        "default-jdk",  # Standard OpenJDK for Java dev
+    ],
+}
+
+# Installed after INSTALL_CATEGORIES in a transaction of its own; skipped by --no-tex.
+TEX_CATEGORIES = {
+    "TEX_LIVE": [
+        "texlive-full",  # Comprehensive LaTeX (~5GB)
+    ],
+}
+
 
 def main():
+    # Block-buffer stdout; Logger.flush() runs before child processes print.
+    sys.stdout.reconfigure(line_buffering=False)
     logger = Logger()
     setup = Setup(logger=logger)
     args = setup.cli_options()
-    setup.check_argv(sys.argv)
-    setup.elevate_privileges()
+    if not args.elevated:
+        setup.check_argv(sys.argv)
+    setup.elevate_privileges(args.elevated)
+
+    if args.vscode:
+        setup.prefetch_vscode_key()
+
+    # install_vscode() refreshes the lists itself after adding its repository,
+    # so --vscode alone only needs this section to install nala.
+    package_actions = args.update or args.remove or args.install or args.clean
+    if package_actions or (args.vscode and shutil.which("nala") is None):
+        logger.section("REFRESH")
+        setup.update(force=args.update or args.force_refresh)
 
     if args.update:
         logger.section("UPDATE")
@@ -303,311 +950,59 @@ def main():
 
     if args.remove:
         logger.section("PURGE & CLEANUP")
-        setup.update()
-
-        categories = {
-            "VIM": [
-                "vim*",
-            ],
-            "UNWANTED": [
-                "gcolor3",
-                "thunderbird*",
-            ],
-        }
-        setup.remove(categories)
+
+        setup.remove(REMOVE_CATEGORIES)
 
         logger.success("Cleaned up unwanted packages from the system")
 
     if args.install:
         logger.section("INSTALL")
-        setup.update()
-
-        categories = {
-            "APT": [
-                # 1. Base
-                "ubuntu-standard",  # Core system utilities
-                "apt-transport-https",  # HTTPS repo support
-                # 2. Management
-                "aptitude",  # Advanced terminal interface
-                "synaptic",  # Graphical package manager
-                # 3. Automation
-                "unattended-upgrades",  # Security auto-patching
-                # 4. Experience
-                "ubuntu-restricted-extras",  # Media codecs and MS fonts
-            ],
-            "PACKAGE_TOOLS": [
-                # 1. Infrastructure
-                "apt-transport-https",  # Protocol support
-                "bash-completion",  # Terminal tab-completion
-                "ca-certificates",  # SSL/TLS validation
-                "software-properties-common",  # Repository management
-                # 2. Frontends
-                "nala",  # Modern terminal frontend
-                "synaptic",  # GUI management tool
-                "apt-file",  # Package file search
-                # 3. Python
-                "python3-apt",  # Python APT bindings
-                # 4. Maintenance
-                "needrestart",  # Service restart prompter
-                "ppa-purge",  # PPA rollback utility
-                "deborphan",  # Orphaned library finder
-            ],
-            "REQUIRED": [
-                # 1. Hardware
-                "thermald",  # Intel thermal management
-                "smartmontools",  # SSD health monitoring
-                # 2. Optimization
-                "haveged",  # Entropy daemon (Speed)
-                "preload",  # Application readahead
-                # 3. CLI Tools
-                "tmux",  # Terminal multiplexer
-                "neovim",  # Terminal text editor
-            ],
-            "UTILITY": [
-                # 1. Navigation
-                "mc",  # Dual-pane file manager
-                "tree",  # Directory tree visualizer
-                "fzf",  # Fuzzy finder (Command-line)
-                "eza",  # Enhanced 'ls' with colors
-                "zoxide",  # Fast directory jumper ('z')
-                # 2. Disk Analysis
-                "duf",  # User-friendly 'df' (Disk info)
-                "ncdu",  # Interactive disk usage analyzer
-                "gdisk",  # GPT partition table manipulator
-                # 3. Text & Data
-                "bat",  # Syntax-highlighting 'cat'
-                "ripgrep",  # Blazing fast 'grep' ('rg')
-                "jq",  # Command-line JSON processor
-                # 4. Configuration
-                "dconf-cli",  # Backend settings access
-                "dconf-editor",  # Graphical settings editor
-            ],
-            "ANALYZE": [
-                # 1. Monitoring
-                "btop",  # Modern dashboard monitor
-                "htop",  # Interactive process viewer
-                "nmon",  # Comprehensive system stats
-                # 2. Specialized
-                "iotop",  # Disk I/O monitor by process
-                # 3. Hardware
-                "hwinfo",  # Hardware probing tool
-                "inxi",  # Full hardware/driver summary
-            ],
-            "NETWORK": [
-                # 1. Base
-                "ca-certificates",  # SSL/TLS validation (Critical)
-                "net-tools",  # Classic 'ifconfig' utilities
-                # 2. Transfer & Speed
-                "curl",  # Versatile data transfer tool
-                "wget",  # Standard file downloader
-                "speedtest-cli",  # Terminal speed test
-                # 3. Remote Access
-                "openssh-client",  # SSH client binary
-                "openssh-server",  # SSH daemon for remote login
-                "openssh-sftp-server",  # Secure file transfer engine
-                "sshfs",  # Filesystem client based on SSH File Transfer Protocol
-            ],
-            "SPELLING": [
-                # 1. Frameworks
-                "libenchant-2-2",  # App-to-dictionary bridge
-                "hunspell",  # Modern standard engine
-                "aspell",  # Classic CLI engine
-                # 2. German (DE)
-                "hunspell-de-de-frami",  # Primary German dict
-                "aspell-de",  # CLI German dict
-                "myspell-dictionary-de",  # Legacy German support
-                "mythes-de",  # German Thesaurus
-                "hyphen-de",  # German Hyphenation
-                # 3. English (EN)
-                "hunspell-en-us",  # Primary English dict
-                "aspell-en",  # CLI English dict
-                "mythes-en-us",  # English Thesaurus
-                "hyphen-en-us",  # English Hyphenation
-            ],
-            "ACCESSORY": [
-                # 1. Themes (Qt/GTK Sync)
-                "adwaita-qt",  # Qt5 theme matching
-                "adwaita-qt6",  # Qt6 theme matching
-                "qt5ct",  # Qt5 config utility
-                "qt6ct",  # Qt6 config utility
-                # 2. Productivity
-                "meld",  # Visual diff/merge tool
-                # 3. Media
-                "cheese",  # Webcam tester
-                "transmission-gtk",  # Lightweight Torrent client
-            ],
-            "OFFICE": [
-                # 1. LibreOffice
-                "libreoffice",  # Full office suite
-                "libreoffice-gtk3",  # XFCE UI integration
-                "libreoffice-style-sifr",  # Flat icon theme
-                "libreoffice-l10n-de",  # German UI translation
-                # 2. Publishing
-                "pandoc",  # Document converter
-                "texlive-full",  # Comprehensive LaTeX (~5GB)
-            ],
-            "GRAPHIC": [
-                # 1. Raster (GIMP)
-                "gimp",  # GNU Image Manipulation Program
-                "gimp-data-extras",  # Brushes and patterns
-                "gimp-plugin-registry",  # Essential plugin bundle
-                "gimp-help-de",  # German GIMP manuals
-                # 2. Vector (Inkscape)
-                "inkscape",  # Vector graphics editor
-                # 3. Hardware
-                "libwacom-common",  # Wacom/Tablet support
-            ],
-            "MULTIMEDIA": [
-                # 1. Playback
-                "mpv",  # Fast, GPU-accelerated player
-                "yt-dlp",  # YouTube/Video downloader
-                # 2. VLC Suite
-                "vlc",  # Universal media player
-                "vlc-l10n",  # German UI for VLC
-                "vlc-plugin-pipewire",  # Native PipeWire audio
-                "vlc-plugin-jack",  # JACK audio support
-                "vlc-plugin-fluidsynth",  # MIDI synth support
-                "vlc-plugin-svg",  # SVG icon support
-                "vlc-plugin-visualization",  # Audio visualizers
-                # 3. Audio Tools
-                "audacity",  # Waveform audio editor
-                "pavucontrol",  # PipeWire/Pulse Mixer
-            ],
-            "CODEC": [
-                # 1. Frameworks
-                "ffmpeg",  # The Swiss-army knife for media
-                "libavif-bin",  # AVIF image support
-                "libwebm-tools",  # WebM processing
-                "libwebm1",  # WebM runtime library
-                # 2. Video
-                "dav1d",  # Ultra-fast AV1 decoder
-                "davs2",  # AVS2 support
-                "rav1e",  # Rust-based AV1 encoder
-                "svt-av1",  # Intel-optimized AV1 (Best for you)
-                "x264",  # H.264/AVC standard
-                "x265",  # H.265/HEVC standard
-                # 3. Audio
-                "aften",  # AC3 toolset
-                "faac",  # AAC encoder
-                "fdkaac",  # FDK-AAC CLI
-                "libfdk-aac2",  # FDK-AAC library
-                "lame",  # MP3 encoder
-                "speex",  # Speech-specific codec
-                # 4. Utilities
-                "mkvtoolnix",  # MKV editor (mkvmerge)
-                "ogmtools",  # OGG/OGM stream tools
-            ],
-            "COMPRESSION": [
-                # 1. Standards
-                "tar",  # Standard Unix archiver
-                "gzip",  # Standard compression
-                "bzip2",  # High compression legacy
-                "zip",  # Universal Windows compatibility
-                "unzip",  # Standard extractor
-                # 2. Parallel (Multi-threaded)
-                "pigz",  # Multi-core GZIP (Fast!)
-                "pbzip2",  # Multi-core BZIP2
-                "lbzip2",  # Fast multi-core BZIP2
-                "pixz",  # Parallel XZ with indexing
-                "zstd",  # Modern Facebook-speed standard
-                "lz4",  # Fastest real-time compression
-                "lrzip",  # For very large archives
-                # 3. Specialized
-                "7zip",  # 7-Zip (Modern p7zip)
-                "zpaq",  # Maximum data density
-                "lzip",  # Error-resilient LZMA
-                "plzip",  # Multi-core LZIP
-                "tarlz",  # Tar with LZIP support
-                "lzop",  # Low-CPU overhead LZO
-                # 4. Legacy & Windows
-                "unar",  # Universal extractor (Best for XFCE)
-                "unrar",  # RAR extraction support
-                "rar",  # RAR creation support
-                "cabextract",  # Microsoft .cab support
-                "lhasa",  # LZH/LHA support
-                "unace",  # ACE support
-                "dar",  # Disk Archive (Backups)
-                "par2",  # Data repair/redundancy
-            ],
-            "DEVELOPMENT_COMPILER": [
-                "build-essential",  # Standard C/C++ toolchain (make, gcc)
-                "cmake",  # Cross-platform build automation
-                "cmake-format",  # Formatter for CMake scripts
-                "ninja-build",  # Fast alternative to 'make'
-                "clang",  # LLVM-based C/C++ compiler
-                "clang-format",  # Standard C++ code formatter
-                "clang-tidy",  # Static analyzer for C++
-                "clang-tools",  # Extra LLVM development utilities
-                "lldb",  # High-performance debugger
-                "libmagic-dev",  # Development files for file-type detection
-                "libmagickwand-dev",  # ImageMagick C-API library
-                "libssl-dev",  # Header files for SSL/TLS
-                "valgrind",  # Memory leak and profiling tool
-            ],
-            "DEVELOPMENT_PYTHON": [
-                "pipx",  # Isolated CLI tool installer (Safe for Mint)
-                "python-is-python3",  # Maps 'python' command to python3
-                "python3-gpg",  # GPG library for your script's logic
-                "python3-pip",  # Standard package installer
-                "python3-venv",  # Native virtual environment support
-                "pipenv",  # Deterministic dependency management
-                "python3-poetry",  # Modern project/package manager
-                "black",  # Uncompromising code formatter
-                "python3-autopep8",  # PEP 8 style guide formatter
-                "python3-flake8",  # Code linter for syntax/style
-                "python3-pytest",  # Advanced testing framework
-            ],
-            "DEVELOPMENT_SHELL": [
-                "expect",  # Automation for interactive CLI prompts
-                "shellcheck",  # Static analysis/linter for scripts
-                "shfmt",  # Shell script formatter
-            ],
-            "DEVELOPMENT_DOCS": [
-                "bash-doc",  # Local documentation for Bash
-                "linux-doc",  # Deep Linux kernel manuals
-                "python3-doc",  # Local Python 3 reference
-                "zeal",  # Offline API documentation browser
-            ],
-            "DEVELOPMENT_JAVA": [
-                "default-jdk",  # Standard OpenJDK for Java dev
-            ],
-        }
-        setup.install(categories)
+
+        # The read-only flatpak queries do not touch APT; let them run meanwhile.
+        flatpak_queries = setup.start_as_user(
+            [["flatpak", "remotes"], ["flatpak", "list"]]
+        )
+        setup.install(INSTALL_CATEGORIES)
+
+        # TeX Live alone outweighs every other category; keep it out of the
+        # main transaction so a failure or --no-tex leaves the rest unaffected.
+        if not args.no_tex:
+            setup.install(TEX_CATEGORIES)
 
         logger.section("FLATPAK MANAGEMENT")
-        logger.step("Checking configured remotes")
-        setup.run_as_user(["flatpak", "remotes"])
-        logger.step("Listing installed flatpaks")
-        setup.run_as_user(["flatpak", "list"])
+        logger.step("Checking configured remotes and listing installed flatpaks")
+        setup.wait_all(flatpak_queries)
 
         logger.subsection("Flatpak Update")
         logger.step("Checking for flatpak updates and runtimes")
-        setup.run_as_user(["flatpak", "update", "-y"])
+        setup.run_as_user(["flatpak", "update", "--noninteractive", "--assumeyes"])
 
         logger.success("All required packages (APT & Flatpak) have been processed")
 
     if args.vscode:
         logger.section("VISUAL STUDIO CODE")
-        setup.update()
         setup.install_vscode()
         logger.success("VS Code installation and repository setup complete")
 
     if args.clean:
         logger.section("CLEAN")
-        setup.update()
         setup.clean()
         logger.success("Cleaned up packages in System")
 
     if args.system:
         logger.section("SYSCTL")
-        setup.apply_sysctl_optimizations()
+        sysctl_changed = setup.apply_sysctl_optimizations()
 
         logger.section("JOURNALD")
         setup.logger.subsection("Configuring System Journal")
-        setup.set_journald_property("Storage", "persistent")
-        setup.set_journald_property("SystemMaxUse", "100M")
-        setup.set_journald_property("SystemMaxFileSize", "50M")
-        setup.set_journald_property("SyncIntervalSec", "5m")
+        journald_changed = setup.set_journald_properties(
+            {
+                "Storage": "persistent",
+                "SystemMaxUse": "100M",
+                "SystemMaxFileSize": "50M",
+                "SyncIntervalSec": "5m",
+            }
+        )
         logger.success("Journald configuration updated")
 
         logger.section("SERVICES")
@@ -618,8 +1013,16 @@ def main():
             "haveged",
             "ssh",
         ]
-        for service in services:
-            setup.activate_service(service)
+        # Only units whose configuration was rewritten above need a restart.
+        if args.force_restart:
+            restart = None
+        else:
+            changed = {
+                "systemd-sysctl": sysctl_changed,
+                "systemd-journald": journald_changed,
+            }
+            restart = [name for name, was_changed in changed.items() if was_changed]
+        setup.activate_services(services, restart)
         logger.success("All system services are optimized and running")
 
     print()